@@ -1,7 +1,8 @@
 from flask import Blueprint, jsonify, request, session
 from app.auth import db
 from app.models import User, TopSongsList, Song, WordCloud, LyricsCache
-from app.tasks.worker import generate_wordcloud_task
+from app.pool_metrics import pool_stats
+from app.tasks.celery_app import celery, GENERATE_WORDCLOUD_TASK
 
 api_bp = Blueprint('api', __name__)
 
@@ -49,8 +50,8 @@ def generate_top_songs():
     user_id = session['user_id']
     time_range = request.json.get('time_range', 'medium_term')
     
-    # Queue the task to generate top songs and word cloud
-    generate_wordcloud_task.delay(user_id, time_range)
+    # Queue the task by name so the web process never imports the worker's dependencies
+    celery.send_task(GENERATE_WORDCLOUD_TASK, args=[user_id, time_range])
     
     return jsonify({"message": "Top songs and word cloud generation started"})
 
@@ -75,10 +76,26 @@ def get_wordcloud():
         "id": wordcloud.id,
         "created_at": wordcloud.created_at.isoformat(),
         "time_range": wordcloud.time_range,
-        "image_url": wordcloud.image_url,
+        # Serve the preview until the full-resolution render lands
+        "image_url": wordcloud.image_url or wordcloud.preview_url,
+        "preview_url": wordcloud.preview_url,
+        "full_url": wordcloud.image_url,
+        "is_preview": wordcloud.image_url is None,
         "top_words": dict(sorted(wordcloud.word_frequencies.items(), 
                                  key=lambda x: x[1], 
                                  reverse=True)[:50])  # Return top 50 words
     }
     
-    return jsonify(result)
\ No newline at end of file
+    return jsonify(result)
+
+@api_bp.route('/health/db-pool', methods=['GET'])
+def get_db_pool_stats():
+    """Connection pool checkout time and saturation.
+
+    Stats are per process: each gunicorn worker has its own pool, so this
+    reports only the worker that served the request.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    return jsonify(pool_stats(db.engine.pool))
\ No newline at end of file
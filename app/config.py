@@ -1,5 +1,47 @@
+import logging
 import os
 from datetime import timedelta
+from sqlalchemy.pool import NullPool
+from app.pool_metrics import InstrumentedQueuePool
+
+logger = logging.getLogger(__name__)
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+def pgbouncer_enabled():
+    """Whether connections go through PgBouncer (DB_PGBOUNCER)"""
+    return _env_bool('DB_PGBOUNCER', False)
+
+def engine_options(database_uri, pool_size=5, max_overflow=10, statement_timeout_ms=0):
+    """SQLAlchemy engine options, overridable through DB_* environment variables"""
+    if not database_uri or database_uri.startswith('sqlite'):
+        # SQLite uses SQLAlchemy's file-based defaults
+        return {}
+    
+    if pgbouncer_enabled():
+        # PgBouncer does the pooling and, in transaction mode, rejects startup
+        # options, so set statement_timeout on the database role instead
+        if int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0')):
+            logger.warning("DB_STATEMENT_TIMEOUT_MS is ignored with DB_PGBOUNCER; "
+                           "set statement_timeout on the database role instead")
+        return {'poolclass': NullPool}
+    
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', max_overflow)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    }
+    
+    # Off unless the environment asks for it; migrate.py clears it regardless
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', statement_timeout_ms))
+    if statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    
+    return options
 
 class Config:
     """Base config."""
@@ -11,16 +53,21 @@ class DevelopmentConfig(Config):
     """Development config."""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///dev.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, pool_size=2, max_overflow=2)
     
 class ProductionConfig(Config):
     """Production config."""
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=10, max_overflow=20, statement_timeout_ms=30000
+    )
     
 class TestingConfig(Config):
     """Testing config."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///test.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, pool_size=1, max_overflow=0)
 
 # Default config
 DefaultConfig = DevelopmentConfig
\ No newline at end of file
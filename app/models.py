@@ -1,4 +1,5 @@
 from app.auth import db
+from app.services.frequencies import pack_frequencies, unpack_frequencies, unpack_tail_summary
 from datetime import datetime
 
 class User(db.Model):
@@ -29,13 +30,18 @@ class TopSongsList(db.Model):
     
     # Relationships
     songs = db.relationship('Song', backref='top_songs_list', lazy=True)
+    
+    # Serves "latest per user and range" lookups and retention
+    __table_args__ = (
+        db.Index('idx_top_songs_user_range_created', 'user_id', 'time_range', 'created_at'),
+    )
 
 
 class Song(db.Model):
     __tablename__ = 'songs'
     
     id = db.Column(db.Integer, primary_key=True)
-    top_songs_list_id = db.Column(db.Integer, db.ForeignKey('top_songs_lists.id'), nullable=False)
+    top_songs_list_id = db.Column(db.Integer, db.ForeignKey('top_songs_lists.id'), nullable=False, index=True)
     spotify_id = db.Column(db.String(255))
     title = db.Column(db.String(255), nullable=False)
     artist = db.Column(db.String(255), nullable=False)
@@ -55,8 +61,32 @@ class WordCloud(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     time_range = db.Column(db.String(20))  # short_term, medium_term, or long_term
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    image_url = db.Column(db.String(255))  # URL to the stored word cloud image
-    word_frequencies = db.Column(db.JSON)  # Store word frequencies as JSON
+    image_url = db.Column(db.String(255))  # URL to the full-resolution image, set once rendered
+    preview_url = db.Column(db.String(255))  # URL to the low-resolution preview image
+    word_frequencies_packed = db.Column(db.LargeBinary)  # Top words packed by app.services.frequencies
+    legacy_word_frequencies = db.Column('word_frequencies', db.JSON(none_as_null=True))  # Pre-packing rows, cleared by migrate.py
+    
+    @property
+    def word_frequencies(self):
+        """Top word frequencies as a dict, whichever format the row is stored in"""
+        if self.word_frequencies_packed is not None:
+            return unpack_frequencies(self.word_frequencies_packed)
+        return self.legacy_word_frequencies or {}
+    
+    @word_frequencies.setter
+    def word_frequencies(self, word_freq):
+        self.word_frequencies_packed = pack_frequencies(word_freq or {})
+        self.legacy_word_frequencies = None
+    
+    @property
+    def word_frequencies_tail(self):
+        """Distinct words and total occurrences dropped when packing"""
+        return unpack_tail_summary(self.word_frequencies_packed)
+    
+    # Serves "latest per user and range" lookups and retention
+    __table_args__ = (
+        db.Index('idx_word_cloud_user_range_created', 'user_id', 'time_range', 'created_at'),
+    )
 
 
 class LyricsCache(db.Model):
@@ -67,8 +97,17 @@ class LyricsCache(db.Model):
     title = db.Column(db.String(255), nullable=False)
     lyrics = db.Column(db.Text)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    last_accessed = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Used to evict idle entries
     
     # Create a unique constraint to prevent duplicates
     __table_args__ = (
         db.UniqueConstraint('artist', 'title', name='uq_artist_title'),
-    )
\ No newline at end of file
+    )
+
+
+class PendingImageDeletion(db.Model):
+    __tablename__ = 'pending_image_deletions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(255), nullable=False)  # Image of a pruned word cloud
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,79 @@
+import logging
+import os
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Checkouts waiting longer than this are logged along with pool saturation
+SLOW_CHECKOUT_SECONDS = float(os.getenv('DB_POOL_SLOW_CHECKOUT', '0.1'))
+
+logger = logging.getLogger(__name__)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long connection checkouts wait"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._slow_checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._checkout_state = threading.local()
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; only time the outer call
+        if getattr(self._checkout_state, 'active', False):
+            return super()._do_get()
+
+        self._checkout_state.active = True
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            logger.warning("DB pool checkout timed out: %s", self.status())
+            raise
+        finally:
+            self._checkout_state.active = False
+
+        wait = time.perf_counter() - start
+        with self._stats_lock:
+            self._checkouts += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            if wait > SLOW_CHECKOUT_SECONDS:
+                self._slow_checkouts += 1
+        if wait > SLOW_CHECKOUT_SECONDS:
+            logger.warning("Slow DB pool checkout (%.0f ms), saturation %.0f%%",
+                           wait * 1000, self.saturation() * 100)
+        return conn
+
+    def saturation(self):
+        """Fraction of the pool's maximum connections currently checked out"""
+        capacity = self.size() + max(self._max_overflow, 0)
+        return self.checkedout() / capacity if capacity else 0.0
+
+    def stats(self):
+        with self._stats_lock:
+            checkouts = self._checkouts
+            return {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "overflow": self.overflow(),
+                "saturation": round(self.saturation(), 3),
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "slow_checkouts": self._slow_checkouts,
+                "avg_wait_ms": round(self._total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+def pool_stats(pool):
+    """Checkout time and saturation for a pool, or its status if not instrumented"""
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"status": pool.status()}
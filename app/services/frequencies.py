@@ -0,0 +1,63 @@
+import struct
+from collections import Counter
+
+# Format version written into the first byte of every packed blob
+FORMAT_VERSION = 1
+
+# Number of words kept verbatim; matches max_words used by the renderer
+TOP_K = 200
+
+# version, word count, tail distinct words, tail total occurrences
+_HEADER = struct.Struct('<BHII')
+_SEPARATOR = b'\x00'
+
+def pack_frequencies(word_freq, top_k=TOP_K):
+    """Pack word frequencies into a compact versioned binary blob.
+
+    Only the ``top_k`` most frequent words are kept; the remaining tail is
+    summarized as its number of distinct words and total occurrences.
+    Words are NUL-separated, so a word containing NUL raises ValueError.
+    """
+    ranked = Counter(word_freq).most_common()
+    top, tail = ranked[:top_k], ranked[top_k:]
+
+    for word, _ in top:
+        if '\x00' in word:
+            raise ValueError(f"Cannot pack word containing NUL: {word!r}")
+
+    words = _SEPARATOR.join(word.encode('utf-8') for word, _ in top)
+    counts = struct.pack(f'<{len(top)}I', *(count for _, count in top))
+    header = _HEADER.pack(
+        FORMAT_VERSION,
+        len(top),
+        len(tail),
+        sum(count for _, count in tail)
+    )
+
+    return header + counts + words
+
+def _unpack(blob):
+    """Split a packed blob into its top words and tail summary"""
+    version, size, tail_words, tail_total = _HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported word frequency format version {version}")
+
+    offset = _HEADER.size
+    counts = struct.unpack_from(f'<{size}I', blob, offset)
+    offset += 4 * size
+    words = bytes(blob[offset:]).split(_SEPARATOR) if size else []
+
+    top = {word.decode('utf-8'): count for word, count in zip(words, counts)}
+    return top, {"words": tail_words, "total": tail_total}
+
+def unpack_frequencies(blob):
+    """Return the top words of a packed blob as a dict, most frequent first"""
+    if not blob:
+        return {}
+    return _unpack(blob)[0]
+
+def unpack_tail_summary(blob):
+    """Return the summary of the words dropped when a blob was packed"""
+    if not blob:
+        return {"words": 0, "total": 0}
+    return _unpack(blob)[1]
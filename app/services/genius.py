@@ -2,9 +2,12 @@ import os
 import lyricsgenius
 import re
 from app.models import LyricsCache
-from datetime import datetime
+from datetime import datetime, timedelta
 from app import db
 
+# Cache hits only rewrite last_accessed when it is older than this
+LYRICS_TOUCH_INTERVAL = timedelta(days=1)
+
 def get_genius_client():
     """Get a Genius client"""
     return lyricsgenius.Genius(
@@ -60,6 +63,10 @@ def get_lyrics(title, artist):
     ).first()
     
     if cached_lyrics:
+        # Record the access at most once per interval to keep reads cheap
+        now = datetime.utcnow()
+        if not cached_lyrics.last_accessed or now - cached_lyrics.last_accessed > LYRICS_TOUCH_INTERVAL:
+            cached_lyrics.last_accessed = now
         return cached_lyrics.lyrics
     
     # Fetch from Genius
@@ -76,7 +83,8 @@ def get_lyrics(title, artist):
                 title=title,
                 artist=artist,
                 lyrics=lyrics,
-                last_updated=datetime.now()
+                last_updated=datetime.now(),
+                last_accessed=datetime.utcnow()
             )
             db.session.add(cache_entry)
             db.session.commit()
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+import multiprocessing
+from multiprocessing import forkserver
+
+# Concurrent render processes; 0 renders inline in the calling process
+RENDER_POOL_PROCESSES = int(os.getenv('RENDER_POOL_PROCESSES', '0'))
+# Renders allowed to be queued or running before callers block
+RENDER_POOL_MAX_PENDING = int(os.getenv('RENDER_POOL_MAX_PENDING', str(2 * max(RENDER_POOL_PROCESSES, 1))))
+# Seconds a render may take, including time spent waiting for a free slot
+RENDER_TIMEOUT = float(os.getenv('RENDER_TIMEOUT', '60'))
+
+# Renders are forked from a fork server that has already imported and warmed
+# the renderer, so each process starts with fonts and colormaps loaded
+_ctx = multiprocessing.get_context('forkserver')
+_ctx.set_forkserver_preload(['app.services.render_preload'])
+
+_pending = threading.BoundedSemaphore(RENDER_POOL_MAX_PENDING)
+_running = threading.BoundedSemaphore(max(RENDER_POOL_PROCESSES, 1))
+
+def _render(word_freq):
+    from app.services.wordcloud import create_wordcloud_image
+    return create_wordcloud_image(word_freq).getvalue()
+
+def _render_child(sender, word_freq):
+    """Entry point of a render process; sends back (ok, png bytes or error)"""
+    try:
+        sender.send((True, _render(word_freq)))
+    except Exception as e:
+        sender.send((False, repr(e)))
+    finally:
+        sender.close()
+
+def pool_enabled():
+    """Whether renders run in separate processes.
+
+    The pool is meant for thread or gevent Celery workers. Prefork children
+    are daemonic and cannot start processes, so they always render inline.
+    """
+    return RENDER_POOL_PROCESSES > 0 and not multiprocessing.current_process().daemon
+
+def start_render_pool():
+    """Start the fork server now rather than on the first render"""
+    if pool_enabled():
+        forkserver.ensure_running()
+
+def _remaining(deadline):
+    return max(deadline - time.monotonic(), 0)
+
+def _render_in_process(word_freq, deadline, timeout):
+    """Render in a dedicated process that is killed if it overruns the deadline"""
+    receiver, sender = _ctx.Pipe(duplex=False)
+    process = _ctx.Process(target=_render_child, args=(sender, dict(word_freq)), daemon=True)
+    process.start()
+    sender.close()
+
+    try:
+        if not receiver.poll(_remaining(deadline)):
+            raise TimeoutError(f"Word cloud render exceeded {timeout}s")
+        ok, payload = receiver.recv()
+    except EOFError:
+        raise RuntimeError("Word cloud render process exited without a result")
+    finally:
+        receiver.close()
+        # Only this render's process is killed; concurrent renders are unaffected
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+    if not ok:
+        raise RuntimeError(f"Word cloud render failed: {payload}")
+    return payload
+
+def render_wordcloud(word_freq, timeout=RENDER_TIMEOUT):
+    """Render a word cloud from frequencies and return the PNG bytes.
+
+    With the pool disabled the render runs inline in the caller; it is
+    thread-safe but cannot be interrupted, so ``timeout`` does not apply.
+    """
+    if not pool_enabled():
+        return _render(word_freq)
+
+    deadline = time.monotonic() + timeout
+
+    # Backpressure: wait for a free slot instead of queueing without bound
+    if not _pending.acquire(timeout=timeout):
+        raise TimeoutError(f"Render pool still saturated after {timeout}s")
+
+    try:
+        if not _running.acquire(timeout=_remaining(deadline)):
+            raise TimeoutError(f"No render process free within {timeout}s")
+        try:
+            return _render_in_process(word_freq, deadline, timeout)
+        finally:
+            _running.release()
+    finally:
+        _pending.release()
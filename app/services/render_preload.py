@@ -0,0 +1,6 @@
+# Preloaded by the render fork server (see render_pool); importing it warms
+# fonts, colormaps and the Agg backend once, and every render process forked
+# afterwards inherits that state
+from app.services.wordcloud import warm_renderer
+
+warm_renderer()
@@ -0,0 +1,131 @@
+import os
+from datetime import datetime, timedelta
+from botocore.exceptions import BotoCoreError, ClientError
+from app import db
+from app.models import User, TopSongsList, Song, WordCloud, LyricsCache, PendingImageDeletion
+from app.services.wordcloud import delete_from_s3
+
+# Generations kept per user and time range
+KEEP_GENERATIONS = int(os.getenv('RETENTION_KEEP_GENERATIONS', '5'))
+# Lyrics cache entries not read for this long are evicted
+LYRICS_MAX_IDLE_DAYS = int(os.getenv('RETENTION_LYRICS_MAX_IDLE_DAYS', '90'))
+# Rows deleted per transaction, so no statement holds locks for long
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '200'))
+# Users whose generations are ranked by a single statement
+RETENTION_USERS_PER_PASS = int(os.getenv('RETENTION_USERS_PER_PASS', '100'))
+
+def _expired_generations(model, keep, batch_size):
+    """Yield batches of ids older than the newest ``keep`` per user and time range.
+
+    Users are paged by id, so each ranking statement only covers their rows
+    and stays bounded however large the table has grown.
+    """
+    last_user_id = 0
+    while True:
+        user_ids = [row.id for row in db.session.query(User.id).filter(
+            User.id > last_user_id
+        ).order_by(User.id).limit(RETENTION_USERS_PER_PASS)]
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        rank = db.func.row_number().over(
+            partition_by=(model.user_id, model.time_range),
+            order_by=(model.created_at.desc(), model.id.desc())
+        ).label('rank')
+        ranked = db.session.query(model.id.label('id'), rank).filter(
+            model.user_id.in_(user_ids)
+        ).subquery()
+        ids = [row.id for row in db.session.query(ranked.c.id).filter(ranked.c.rank > keep)]
+        db.session.commit()  # End the read transaction before deleting
+
+        for i in range(0, len(ids), batch_size):
+            yield ids[i:i + batch_size]
+
+def prune_top_songs_lists(keep=KEEP_GENERATIONS, batch_size=RETENTION_BATCH_SIZE):
+    """Delete old top songs lists and their songs, one batch per transaction"""
+    deleted = 0
+    for ids in _expired_generations(TopSongsList, keep, batch_size):
+        Song.query.filter(Song.top_songs_list_id.in_(ids)).delete(synchronize_session=False)
+        TopSongsList.query.filter(TopSongsList.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+
+    return deleted
+
+def prune_word_clouds(keep=KEEP_GENERATIONS, batch_size=RETENTION_BATCH_SIZE):
+    """Delete old word clouds, queueing their S3 images for deletion"""
+    deleted = 0
+    for ids in _expired_generations(WordCloud, keep, batch_size):
+        urls = db.session.query(WordCloud.image_url, WordCloud.preview_url).filter(
+            WordCloud.id.in_(ids)
+        ).all()
+
+        # Recorded in the same transaction as the delete, so no image is
+        # forgotten if S3 is unavailable afterwards
+        for url in (url for pair in urls for url in pair if url):
+            db.session.add(PendingImageDeletion(url=url))
+        WordCloud.query.filter(WordCloud.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+
+    return deleted
+
+def purge_pending_images(batch_size=RETENTION_BATCH_SIZE):
+    """Delete queued S3 images; failures stay queued for the next run"""
+    purged = 0
+    last_id = 0
+    while True:
+        pending = db.session.query(PendingImageDeletion.id, PendingImageDeletion.url).filter(
+            PendingImageDeletion.id > last_id
+        ).order_by(PendingImageDeletion.id).limit(batch_size).all()
+        db.session.commit()  # Do not hold a transaction open across S3 calls
+        if not pending:
+            break
+        last_id = pending[-1].id
+
+        try:
+            failed = set(delete_from_s3([row.url for row in pending]))
+        except (BotoCoreError, ClientError) as e:
+            print(f"Error deleting images from S3, retrying next run: {e}")
+            continue
+
+        done = [row.id for row in pending if row.url not in failed]
+        PendingImageDeletion.query.filter(
+            PendingImageDeletion.id.in_(done)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        purged += len(done)
+
+    return purged
+
+def evict_lyrics(max_idle_days=LYRICS_MAX_IDLE_DAYS, batch_size=RETENTION_BATCH_SIZE):
+    """Evict lyrics cache entries that have not been read recently"""
+    cutoff = datetime.utcnow() - timedelta(days=max_idle_days)
+    evicted = 0
+    while True:
+        ids = [row.id for row in db.session.query(LyricsCache.id).filter(
+            LyricsCache.last_accessed < cutoff
+        ).limit(batch_size)]
+        if not ids:
+            break
+
+        LyricsCache.query.filter(LyricsCache.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        evicted += len(ids)
+
+    return evicted
+
+def run_retention():
+    """Apply every retention rule and report what was removed"""
+    top_songs_lists = prune_top_songs_lists()
+    word_clouds = prune_word_clouds()
+    images = purge_pending_images()
+    lyrics = evict_lyrics()
+
+    return {
+        "top_songs_lists": top_songs_lists,
+        "word_clouds": word_clouds,
+        "images": images,
+        "lyrics_cache": lyrics,
+    }
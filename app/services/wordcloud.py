@@ -1,12 +1,16 @@
 import io
 import re
 from collections import Counter
+from functools import lru_cache
 from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import boto3
 import os
 import uuid
+from urllib.parse import urlparse
 from botocore.exceptions import NoCredentialsError
+from app.services.render_pool import render_wordcloud
 
 # Common words to exclude
 STOPWORDS = {
@@ -17,6 +21,12 @@ STOPWORDS = {
     'yeah', 'uh', 'gonna', 'wanna', 'gotta', 'na', 'cause', 'em', 'yo', 'll'
 }
 
+# Preview layout runs on a small canvas and is upscaled when drawn
+PREVIEW_WIDTH = 300
+PREVIEW_HEIGHT = 200
+PREVIEW_SCALE = 2
+PREVIEW_MAX_WORDS = 60
+
 def process_lyrics(text):
     """Process lyrics for word cloud"""
     # Extract words, convert to lowercase
@@ -40,27 +50,77 @@ def create_wordcloud_image(word_freq):
         random_state=42
     ).generate_from_frequencies(word_freq)
     
-    # Save to a BytesIO object
+    # Save to a BytesIO object; a standalone Figure keeps no pyplot global
+    # state, so concurrent renders in one process do not interfere
     img_data = io.BytesIO()
-    plt.figure(figsize=(12, 8))
-    plt.imshow(wc, interpolation='bilinear')
-    plt.axis('off')
-    plt.tight_layout(pad=0)
-    plt.savefig(img_data, format='png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.imshow(wc, interpolation='bilinear')
+    ax.axis('off')
+    fig.tight_layout(pad=0)
+    fig.savefig(img_data, format='png', dpi=300, bbox_inches='tight')
     img_data.seek(0)
     
     return img_data
 
-def upload_to_s3(img_data, filename):
-    """Upload an image to S3"""
-    # Configure S3
-    s3 = boto3.client(
+def create_preview_image(word_freq):
+    """Generate a low-resolution word cloud image for quick display"""
+    wc = WordCloud(
+        width=PREVIEW_WIDTH,
+        height=PREVIEW_HEIGHT,
+        scale=PREVIEW_SCALE,
+        background_color='white',
+        colormap='viridis',
+        max_words=PREVIEW_MAX_WORDS,
+        prefer_horizontal=0.9,
+        collocations=False,
+        random_state=42
+    ).generate_from_frequencies(word_freq)
+    
+    # Skip matplotlib and encode the layout directly
+    img_data = io.BytesIO()
+    wc.to_image().save(img_data, format='PNG')
+    img_data.seek(0)
+    
+    return img_data
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """Get a shared S3 client; boto3 clients are thread-safe"""
+    return boto3.client(
         's3',
         aws_access_key_id=os.getenv('AWS_ACCESS_KEY'),
         aws_secret_access_key=os.getenv('AWS_SECRET_KEY'),
         region_name=os.getenv('AWS_REGION')
     )
+
+def warm_renderer():
+    """Load fonts and colormaps so the first render is not slowed down"""
+    # A tiny canvas and low dpi exercise the same code paths at almost no cost
+    wc = WordCloud(
+        width=64,
+        height=64,
+        colormap='viridis',
+        random_state=42
+    ).generate_from_frequencies({'warm': 2, 'up': 1})
+    
+    img_data = io.BytesIO()
+    fig = Figure(figsize=(1, 1))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.imshow(wc, interpolation='bilinear')
+    ax.axis('off')
+    fig.savefig(img_data, format='png', dpi=10)
+
+def warm_up():
+    """Warm the renderer and the S3 client"""
+    warm_renderer()
+    get_s3_client()
+
+def upload_to_s3(img_data, filename):
+    """Upload an image to S3"""
+    s3 = get_s3_client()
     S3_BUCKET = os.getenv('S3_BUCKET')
     
     try:
@@ -75,18 +135,55 @@ def upload_to_s3(img_data, filename):
         print("AWS credentials not available")
         return None
 
-def generate_wordcloud(user_id, lyrics, time_range):
-    """Generate and save a word cloud from lyrics"""
+def delete_from_s3(urls):
+    """Delete the S3 objects behind image URLs, returning the URLs that failed.
+
+    Per-object failures are returned; request-level botocore errors raise.
+    """
+    url_by_key = {urlparse(url).path.lstrip('/'): url for url in urls if url}
+    keys = list(url_by_key)
+    if not keys:
+        return []
+    
+    s3 = get_s3_client()
+    S3_BUCKET = os.getenv('S3_BUCKET')
+    failed = []
+    
+    # delete_objects accepts at most 1000 keys per request
+    for i in range(0, len(keys), 1000):
+        response = s3.delete_objects(
+            Bucket=S3_BUCKET,
+            Delete={'Objects': [{'Key': key} for key in keys[i:i + 1000]], 'Quiet': True}
+        )
+        for error in response.get('Errors', []):
+            print(f"Error deleting {error['Key']} from S3: {error['Message']}")
+            failed.append(url_by_key[error['Key']])
+    
+    return failed
+
+def generate_preview(user_id, lyrics, time_range):
+    """Generate and save a preview word cloud from lyrics"""
     # Process lyrics
     word_freq = process_lyrics(lyrics)
     
+    # Generate preview image inline; it takes milliseconds
+    img_data = create_preview_image(word_freq)
+    
+    # Generate a unique filename
+    filename = f"wordcloud/{user_id}/{time_range}/{uuid.uuid4()}-preview.png"
+    
+    # Upload to S3
+    preview_url = upload_to_s3(img_data, filename)
+    
+    return preview_url, dict(word_freq)
+
+def generate_wordcloud(user_id, word_freq, time_range):
+    """Generate and save a full-resolution word cloud from word frequencies"""
     # Generate word cloud image
-    img_data = create_wordcloud_image(word_freq)
+    img_data = io.BytesIO(render_wordcloud(word_freq))
     
     # Generate a unique filename
     filename = f"wordcloud/{user_id}/{time_range}/{uuid.uuid4()}.png"
     
     # Upload to S3
-    image_url = upload_to_s3(img_data, filename)
-    
-    return image_url, dict(word_freq)
\ No newline at end of file
+    return upload_to_s3(img_data, filename)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from celery import Celery
+import os
+
+# Task names, so the web process can enqueue without importing the worker module
+GENERATE_WORDCLOUD_TASK = 'app.tasks.worker.generate_wordcloud_task'
+RENDER_FULL_WORDCLOUD_TASK = 'app.tasks.worker.render_full_wordcloud_task'
+RETENTION_TASK = 'app.tasks.worker.retention_task'
+
+celery = Celery('app.tasks.worker')
+celery.conf.update(
+    broker_url=os.getenv('CELERY_BROKER_URL'),
+    result_backend=os.getenv('CELERY_RESULT_BACKEND'),
+    beat_schedule={
+        'retention': {
+            'task': RETENTION_TASK,
+            'schedule': float(os.getenv('RETENTION_INTERVAL_SECONDS', '86400')),
+        },
+    }
+)
@@ -1,18 +1,38 @@
-from celery import Celery
-import os
+import resource
+import time
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import BotoCoreError, ClientError
+from celery.signals import worker_init, worker_process_init
 from app import db  # This works because celery will execute this within the app context
 from app.models import User, TopSongsList, Song, WordCloud as WordCloudModel, LyricsCache
 from app.services.spotify import get_user_top_tracks
 from app.services.genius import get_lyrics
-from app.services.wordcloud import generate_wordcloud
+from app.services.wordcloud import generate_preview, generate_wordcloud, warm_up
+from app.services.render_pool import start_render_pool
+from app.services.retention import run_retention
+from app.tasks.celery_app import celery, GENERATE_WORDCLOUD_TASK, RENDER_FULL_WORDCLOUD_TASK, RETENTION_TASK
 
-celery = Celery(__name__)
-celery.conf.update(
-    broker_url=os.getenv('CELERY_BROKER_URL'),
-    result_backend=os.getenv('CELERY_RESULT_BACKEND')
-)
+@worker_process_init.connect
+def warm_worker_process(**kwargs):
+    """Build fonts, colormaps and clients before the first task arrives"""
+    start = time.perf_counter()
+    warm_up()
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Worker warm-up took {time.perf_counter() - start:.2f}s, max RSS {rss_mb:.0f} MB")
+
+@worker_init.connect
+def warm_worker(sender=None, **kwargs):
+    """Warm thread and gevent workers, which run tasks in the main process"""
+    pool = sender.pool_cls
+    if not isinstance(pool, str):
+        pool = pool.__module__.rsplit('.', 1)[-1]
+    if pool in ('prefork', 'processes', 'solo'):
+        return  # These pools send worker_process_init in the process that runs tasks
+    
+    warm_worker_process()
+    start_render_pool()
 
-@celery.task
+@celery.task(name=GENERATE_WORDCLOUD_TASK)
 def generate_wordcloud_task(user_id, time_range='medium_term'):
     """Generate top songs and word cloud for a user"""
     # Get top tracks from Spotify
@@ -28,6 +48,7 @@ def generate_wordcloud_task(user_id, time_range='medium_term'):
     
     # Collect all lyrics
     all_lyrics = ""
+    wordcloud = None
     
     # Add songs to the database
     for i, track in enumerate(top_tracks, 1):
@@ -54,14 +75,14 @@ def generate_wordcloud_task(user_id, time_range='medium_term'):
     
     # Process lyrics for word cloud
     if all_lyrics:
-        # Generate word cloud
-        image_url, word_frequencies = generate_wordcloud(user_id, all_lyrics, time_range)
+        # Generate a quick preview; the full render follows in its own task
+        preview_url, word_frequencies = generate_preview(user_id, all_lyrics, time_range)
         
         # Create word cloud record
         wordcloud = WordCloudModel(
             user_id=user_id,
             time_range=time_range,
-            image_url=image_url,
+            preview_url=preview_url,
             word_frequencies=word_frequencies
         )
         db.session.add(wordcloud)
@@ -69,4 +90,51 @@ def generate_wordcloud_task(user_id, time_range='medium_term'):
     # Commit all changes
     db.session.commit()
     
-    return {"status": "success"}
\ No newline at end of file
+    if wordcloud:
+        render_full_wordcloud_task.delay(wordcloud.id)
+    
+    return {"status": "success"}
+
+@celery.task(
+    name=RENDER_FULL_WORDCLOUD_TASK,
+    # Transient failures: render pool backpressure, slow or crashed renders,
+    # and S3 connection or upload errors
+    autoretry_for=(TimeoutError, RuntimeError, BotoCoreError, ClientError, S3UploadFailedError),
+    retry_backoff=True,
+    max_retries=5
+)
+def render_full_wordcloud_task(wordcloud_id):
+    """Render the full-resolution image for a word cloud that has a preview"""
+    wordcloud = WordCloudModel.query.get(wordcloud_id)
+    if not wordcloud:
+        return {"status": "missing"}
+    if wordcloud.image_url:
+        return {"status": "success"}
+    
+    # Stored frequencies keep the top words, which is all the renderer draws
+    user_id = wordcloud.user_id
+    word_frequencies = wordcloud.word_frequencies
+    time_range = wordcloud.time_range
+    
+    # Release the connection rather than sit idle in a transaction while rendering
+    db.session.rollback()
+    
+    image_url = generate_wordcloud(user_id, word_frequencies, time_range)
+    if not image_url:
+        # upload_to_s3 only returns None when credentials are missing, which a
+        # retry will not fix
+        print(f"Full render of word cloud {wordcloud_id} not stored: no AWS credentials")
+        return {"status": "failed"}
+    
+    wordcloud.image_url = image_url
+    db.session.commit()
+    
+    return {"status": "success"}
+
+@celery.task(name=RETENTION_TASK)
+def retention_task():
+    """Prune old generations and idle lyrics cache entries"""
+    removed = run_retention()
+    print(f"Retention removed {removed}")
+    
+    return {"status": "success", "removed": removed}
@@ -0,0 +1,127 @@
+"""Idempotent schema and data migrations.
+
+Run ``python migrate.py`` after deploying; every step checks what is already
+in place, so it is safe to run repeatedly.
+
+Flask-Migrate is listed in requirements.txt but was never set up here: there
+is no migrations/ directory or Migrate(app, db) call, and existing databases
+were created with db.create_all(), so there is no Alembic revision to build
+on. These steps bring such databases up to date directly.
+"""
+from sqlalchemy import event, inspect, text
+from app import app, db
+from app.config import pgbouncer_enabled
+from app.models import TopSongsList, Song, WordCloud, LyricsCache
+from app.services.frequencies import pack_frequencies
+
+def clear_statement_timeout():
+    """Let migrations run past the statement_timeout configured for the app"""
+    # Behind PgBouncer the timeout comes from the database role, and a session
+    # SET would stick to a server connection other clients reuse
+    if db.engine.dialect.name != 'postgresql' or pgbouncer_enabled():
+        return
+
+    @event.listens_for(db.engine, 'connect')
+    def _no_statement_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('SET statement_timeout = 0')
+        cursor.close()
+        dbapi_connection.commit()
+
+    # Drop connections opened before the listener was installed
+    db.engine.dispose()
+
+def add_column(table, column):
+    """Add a column to an existing table if it is missing"""
+    columns = {c['name'] for c in inspect(db.engine).get_columns(table)}
+    if column.name in columns:
+        return
+
+    column_type = column.type.compile(dialect=db.engine.dialect)
+    with db.engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column.name} {column_type}'))
+    print(f"Added column {table}.{column.name}")
+
+def add_packed_word_frequencies():
+    add_column('word_clouds', WordCloud.__table__.c.word_frequencies_packed)
+
+def add_preview_url():
+    add_column('word_clouds', WordCloud.__table__.c.preview_url)
+
+def add_lyrics_last_accessed():
+    add_column('lyrics_cache', LyricsCache.__table__.c.last_accessed)
+
+def create_index(index):
+    """Create an index if missing, without blocking writes on Postgres"""
+    if db.engine.dialect.name != 'postgresql':
+        index.create(bind=db.engine, checkfirst=True)
+        return
+
+    # CONCURRENTLY cannot run inside a transaction block
+    columns = ', '.join(column.name for column in index.columns)
+    unique = 'UNIQUE ' if index.unique else ''
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text(
+            f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index.name} '
+            f'ON {index.table.name} ({columns})'
+        ))
+
+def add_retention_indexes():
+    """Create indexes used by latest-per-user lookups and retention"""
+    for model in (TopSongsList, Song, WordCloud, LyricsCache):
+        for index in model.__table__.indexes:
+            create_index(index)
+
+def backfill_lyrics_last_accessed(batch_size=500):
+    """Treat entries from before access tracking as last read when updated"""
+    while True:
+        ids = [row.id for row in db.session.query(LyricsCache.id).filter(
+            LyricsCache.last_accessed.is_(None)
+        ).limit(batch_size)]
+        if not ids:
+            break
+
+        LyricsCache.query.filter(LyricsCache.id.in_(ids)).update(
+            {LyricsCache.last_accessed: db.func.coalesce(LyricsCache.last_updated, db.func.now())},
+            synchronize_session=False
+        )
+        db.session.commit()
+
+def pack_word_frequencies(batch_size=500):
+    """Convert JSON word frequencies to the packed format in batches"""
+    converted = 0
+    while True:
+        rows = WordCloud.query.filter(
+            WordCloud.word_frequencies_packed.is_(None)
+        ).order_by(WordCloud.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        for row in rows:
+            row.word_frequencies_packed = pack_frequencies(row.legacy_word_frequencies or {})
+            row.legacy_word_frequencies = None
+        db.session.commit()
+        converted += len(rows)
+
+    print(f"Packed word frequencies for {converted} word clouds")
+
+# Steps run in order; schema changes come before data steps that query the models
+MIGRATIONS = [
+    add_packed_word_frequencies,
+    add_preview_url,
+    add_lyrics_last_accessed,
+    add_retention_indexes,
+    pack_word_frequencies,
+    backfill_lyrics_last_accessed,
+]
+
+def main():
+    with app.app_context():
+        clear_statement_timeout()
+        db.create_all()
+        for step in MIGRATIONS:
+            step()
+
+if __name__ == '__main__':
+    main()
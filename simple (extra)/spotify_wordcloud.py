@@ -1,4 +1,7 @@
 import os
+import sys
+import argparse
+import sqlite3
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 import lyricsgenius
@@ -9,8 +12,10 @@ import matplotlib.pyplot as plt
 import re
 from collections import Counter
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import time
+import matplotlib
+matplotlib.use('Agg')  # Render processes never open a display
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,7 +25,8 @@ SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 GENIUS_TOKEN = os.getenv("GENIUS_TOKEN")
 REDIRECT_URI = "http://localhost:8888/callback"
-CACHE_FILE = "lyrics_cache.json"
+CACHE_FILE = "lyrics_cache.json"  # Legacy cache, imported into LYRICS_DB once
+LYRICS_DB = "lyrics_cache.db"
 TOP_SONGS_FILE = "top_songs.txt"
 WORDCLOUD_FILE = "lyrics_wordcloud.png"
 
@@ -33,6 +39,18 @@ STOPWORDS = {
     'yeah', 'uh', 'gonna', 'wanna', 'gotta', 'na', 'cause', 'em', 'yo', 'll'
 }
 
+# Initialize Genius API
+def setup_genius():
+    return lyricsgenius.Genius(
+        GENIUS_TOKEN,
+        remove_section_headers=True,
+        skip_non_songs=True,
+        excluded_terms=["Remix", "Live", "Demo", "Instrumental"],
+        verbose=False,
+        timeout=5,  # Shorter timeout for faster failures
+        retries=1   # Less retries for speed
+    )
+
 # Initialize Spotify and Genius APIs
 def setup_apis():
     sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
@@ -43,28 +61,40 @@ def setup_apis():
         cache_path=".spotify_cache"  # Cache Spotify auth token
     ))
     
-    genius = lyricsgenius.Genius(
-        GENIUS_TOKEN,
-        remove_section_headers=True,
-        skip_non_songs=True,
-        excluded_terms=["Remix", "Live", "Demo", "Instrumental"],
-        verbose=False,
-        timeout=5,  # Shorter timeout for faster failures
-        retries=1   # Less retries for speed
-    )
-    
-    return sp, genius
+    return sp, setup_genius()
 
-# Simple cache for lyrics
-def load_cache():
-    if Path(CACHE_FILE).exists():
+# Incremental on-disk lyrics store; each fetched song is a single row insert
+def open_store(path=LYRICS_DB):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS lyrics (key TEXT PRIMARY KEY, lyrics TEXT)")
+    
+    # Import the old JSON cache the first time the store is created
+    empty = conn.execute("SELECT 1 FROM lyrics LIMIT 1").fetchone() is None
+    if empty and Path(CACHE_FILE).exists():
         with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+            conn.executemany("INSERT OR IGNORE INTO lyrics VALUES (?, ?)", json.load(f).items())
+    conn.commit()
+    
+    return conn
+
+def lookup_lyrics(conn, keys):
+    found = {}
+    keys = list(keys)
+    # Stay under SQLite's bound parameter limit
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT key, lyrics FROM lyrics WHERE key IN ({placeholders})", chunk)
+        found.update(rows)
+    return found
 
-def save_cache(cache):
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache, f)
+def store_lyrics(conn, key, lyrics):
+    conn.execute("INSERT OR REPLACE INTO lyrics VALUES (?, ?)", (key, lyrics))
+    conn.commit()
+
+def song_key(song):
+    return f"{song['title'].lower()}|{song['artist'].lower()}"
 
 # Clean lyrics by removing metadata and formatting artifacts
 def clean_lyrics(lyrics):
@@ -100,48 +130,54 @@ def clean_lyrics(lyrics):
     
     return lyrics.strip()
 
-# Get lyrics for a song - for parallel fetching
-def fetch_lyrics(song, genius, cache):
-    title = song['title']
-    artist = song['artist']
-    key = f"{title.lower()}|{artist.lower()}"
-    
-    # Check cache first
-    if key in cache:
-        return song, cache[key]
-    
-    # Try to fetch lyrics
+# Get lyrics for a song from Genius - for parallel fetching
+def fetch_lyrics(song, genius):
     try:
-        result = genius.search_song(title, artist)
+        result = genius.search_song(song['title'], song['artist'])
         lyrics = result.lyrics if result else None
         
         # Clean the lyrics before caching
-        if lyrics:
-            lyrics = clean_lyrics(lyrics)
-            cache[key] = lyrics
-            
-        return song, lyrics
+        return song, clean_lyrics(lyrics)
     except Exception:
         return song, None
 
-# Fetch lyrics in parallel using ThreadPoolExecutor
-def get_lyrics_parallel(songs, genius, cache, max_workers=10):
-    all_lyrics = ""
-    updated_songs = []
+# Resolve lyrics from the store, fetching misses in parallel using ThreadPoolExecutor
+def resolve_lyrics(songs, genius, conn, max_workers=10):
+    keys = {song_key(song) for song in songs}
+    lyrics_by_key = lookup_lyrics(conn, keys)
+    hits = len(lyrics_by_key)
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all fetch tasks
-        futures = {executor.submit(fetch_lyrics, song, genius, cache): song for song in songs}
-        
-        # Process results as they complete
-        for future in as_completed(futures):
-            song, lyrics = future.result()
-            updated_songs.append(song)
-            if lyrics:
-                all_lyrics += lyrics + "\n"
-            time.sleep(0.1)  # Small delay to prevent rate limiting
+    missing = {}
+    for song in songs:
+        key = song_key(song)
+        if key not in lyrics_by_key:
+            missing.setdefault(key, song)
+    
+    if missing:
+        if not genius and not GENIUS_TOKEN:
+            sys.exit(f"Error: Please set the GENIUS_TOKEN environment variable to fetch {len(missing)} uncached songs")
+        genius = genius or setup_genius()
+        # max_workers bounds concurrent Genius requests
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(fetch_lyrics, song, genius) for song in missing.values()]
+            
+            # Store results as they complete
+            for future in as_completed(futures):
+                song, lyrics = future.result()
+                lyrics_by_key[song_key(song)] = lyrics
+                if lyrics:
+                    store_lyrics(conn, song_key(song), lyrics)
+    
+    return lyrics_by_key, {"hits": hits, "fetched": len(missing)}
+
+def get_lyrics_parallel(songs, genius, conn, max_workers=10):
+    lyrics_by_key, _ = resolve_lyrics(songs, genius, conn, max_workers)
+    all_lyrics = "".join(
+        lyrics_by_key[song_key(song)] + "\n"
+        for song in songs if lyrics_by_key.get(song_key(song))
+    )
     
-    return updated_songs, all_lyrics
+    return songs, all_lyrics
 
 # Process lyrics for word cloud
 def process_lyrics(text):
@@ -154,7 +190,7 @@ def process_lyrics(text):
     return Counter(words)
 
 # Generate word cloud with optimized settings
-def create_wordcloud(word_freq):
+def create_wordcloud(word_freq, output_file=WORDCLOUD_FILE):
     wc = WordCloud(
         width=1200, 
         height=800,
@@ -171,10 +207,141 @@ def create_wordcloud(word_freq):
     plt.imshow(wc, interpolation='bilinear')
     plt.axis('off')
     plt.tight_layout(pad=0)
-    plt.savefig(WORDCLOUD_FILE, dpi=300, bbox_inches='tight')
+    plt.savefig(output_file, dpi=300, bbox_inches='tight')
     plt.close()
 
+# Render one user's cloud - runs in a worker process
+def render_job(all_lyrics, output_file):
+    word_freq = process_lyrics(all_lyrics)
+    if not word_freq:
+        return None
+    create_wordcloud(word_freq, output_file)
+    return output_file
+
+def write_top_songs(songs, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, song in enumerate(songs, 1):
+            f.write(f"{i}. {song['title']} - {song['artist']}\n")
+
+# Turn an exported track (Spotify API item or {"title", "artist"}) into a song
+def normalize_track(track):
+    if 'artists' in track:
+        return {'title': track['name'], 'artist': track['artists'][0]['name']}
+    return {'title': track['title'], 'artist': track['artist']}
+
+# Accepts a Spotify top-tracks response, a list of tracks, or {name: tracks}
+# Lists that cannot be parsed are recorded in errors as (name, message)
+def parse_track_lists(data, default_name, errors):
+    if isinstance(data, dict) and 'items' in data:
+        data = data['items']
+    if isinstance(data, list):
+        try:
+            return [(default_name, [normalize_track(t) for t in data])]
+        except (KeyError, IndexError, TypeError) as e:
+            errors.append((default_name, f"malformed track: {e!r}"))
+            return []
+    if not isinstance(data, dict):
+        errors.append((default_name, "expected a track list or a mapping of names to track lists"))
+        return []
+    
+    track_lists = []
+    for name, tracks in data.items():
+        track_lists.extend(parse_track_lists(tracks, name, errors))
+    return track_lists
+
+def load_track_lists(inputs, errors):
+    track_lists = []
+    for path in inputs:
+        try:
+            if path == '-':
+                track_lists.extend(parse_track_lists(json.load(sys.stdin), 'stdin', errors))
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    track_lists.extend(parse_track_lists(json.load(f), Path(path).stem, errors))
+        except (OSError, ValueError) as e:
+            errors.append((path, str(e)))
+    return track_lists
+
+# Safe, unique file name prefixes for each list, in input order
+def output_names(track_lists):
+    names = []
+    seen = set()
+    for name, _ in track_lists:
+        base = re.sub(r'[^\w.-]+', '_', name).strip('._') or 'list'
+        unique = base
+        suffix = 2
+        while unique.lower() in seen:
+            unique = f"{base}_{suffix}"
+            suffix += 1
+        seen.add(unique.lower())
+        names.append(unique)
+    return names
+
+def run_batch(inputs, output_dir, render_workers=None, fetch_workers=10):
+    start_time = time.time()
+    
+    errors = []
+    track_lists = load_track_lists(inputs, errors)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Resolve lyrics for every song once, across all users
+    all_songs = [song for _, songs in track_lists for song in songs]
+    conn = open_store()
+    lyrics_by_key, stats = resolve_lyrics(all_songs, None, conn, fetch_workers)
+    conn.close()
+    lyrics_time = time.time() - start_time
+    
+    # Render clouds across all cores
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=render_workers) as executor:
+        futures = {}
+        for name, (_, songs) in zip(output_names(track_lists), track_lists):
+            write_top_songs(songs, output_dir / f"{name}_top_songs.txt")
+            all_lyrics = "".join(
+                lyrics_by_key[song_key(song)] + "\n"
+                for song in songs if lyrics_by_key.get(song_key(song))
+            )
+            if all_lyrics:
+                output_file = output_dir / f"{name}_wordcloud.png"
+                futures[executor.submit(render_job, all_lyrics, str(output_file))] = name
+        
+        for future in as_completed(futures):
+            # One failed render should not cost the rest of the batch
+            try:
+                if future.result():
+                    rendered += 1
+                    print(f"✓ Word cloud created for {futures[future]}")
+            except Exception as e:
+                errors.append((futures[future], f"render failed: {e!r}"))
+    
+    elapsed = time.time() - start_time
+    print(f"✓ {len(track_lists)} lists, {len(all_songs)} songs "
+          f"({stats['hits']} cached, {stats['fetched']} fetched) in {lyrics_time:.2f} seconds")
+    print(f"✓ {rendered} word clouds rendered, completed in {elapsed:.2f} seconds "
+          f"({rendered / elapsed:.2f} clouds/s)")
+    if errors:
+        print(f"✗ {len(errors)} lists failed:")
+        for name, message in errors:
+            print(f"  {name}: {message}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate lyrics word clouds from Spotify top tracks")
+    parser.add_argument('inputs', nargs='*',
+                        help="Exported top-track JSON files ('-' for stdin); omit to use your Spotify account")
+    parser.add_argument('--output-dir', default='.', help="Where batch outputs are written")
+    parser.add_argument('--render-workers', type=int, default=None,
+                        help="Render processes (default: all cores)")
+    parser.add_argument('--fetch-workers', type=int, default=10,
+                        help="Concurrent Genius requests")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.inputs:
+        run_batch(args.inputs, args.output_dir, args.render_workers, args.fetch_workers)
+        return
+    
     # Start timing
     start_time = time.time()
     
@@ -187,7 +354,7 @@ def main():
     
     # Set up APIs
     sp, genius = setup_apis()
-    cache = load_cache()
+    conn = open_store()
     
     # Get top songs from Spotify - use smaller limit for faster run (adjust as needed)
     top_tracks = sp.current_user_top_tracks(limit=30, time_range='medium_term')['items']
@@ -202,15 +369,11 @@ def main():
         })
     
     # Fetch lyrics in parallel
-    songs, all_lyrics = get_lyrics_parallel(songs, genius, cache)
+    songs, all_lyrics = get_lyrics_parallel(songs, genius, conn)
+    conn.close()
     
     # Write top songs to file
-    with open(TOP_SONGS_FILE, 'w', encoding='utf-8') as f:
-        for i, song in enumerate(songs, 1):
-            f.write(f"{i}. {song['title']} - {song['artist']}\n")
-    
-    # Save cache for future runs
-    save_cache(cache)
+    write_top_songs(songs, TOP_SONGS_FILE)
     
     # Create word cloud if we have lyrics
     if all_lyrics: